@@ -24,7 +24,7 @@ import ctypes
 import functools
 from ..base import _LIB, check_call, string_types
 from ..base import mx_uint, NDArrayHandle, c_array
-from ..ndarray import NDArray, zeros_like
+from ..ndarray import NDArray, zeros
 from ..symbol import _GRAD_REQ_MAP
 
 
@@ -182,16 +182,20 @@ def grad_and_loss(func, argnum=None):
     grad_and_loss_func: a python function
         A function that would compute both the gradient of arguments and loss value.
     """
+    # normalize argnum once at construction instead of on every call
+    if argnum is None:
+        select = lambda args: args
+    else:
+        idxs = argnum if isinstance(argnum, list) else [argnum]
+        select = lambda args: [args[i] for i in idxs]
     @functools.wraps(func)
     def wrapped(*args):
         """Wrapped function."""
-        variables = args
-        if argnum is not None:
-            argnum_ = argnum if isinstance(argnum, list) else [argnum]
-            variables = [args[i] for i in argnum_]
-        for x in variables:
-            assert isinstance(x, NDArray), "type of autograd input should NDArray."
-        grads = [zeros_like(x) for x in variables]
+        variables = select(args)
+        assert all(isinstance(x, NDArray) for x in variables), \
+            "type of autograd input should NDArray."
+        grads = [zeros(x.shape, ctx=x.context, dtype=x.dtype)
+                 for x in variables]
         mark_variables(variables, grads)
         with train_section():
             outputs = func(*args)
@@ -230,8 +234,23 @@ def grad(func, argnum=None):
     >>>     inputs = nd.array([[1, 2, 3], [4, 5, 6]])
     >>>     grad_vals = grad_func(inputs)
     """
-    grad_with_loss_func = grad_and_loss(func, argnum)
-    @functools.wraps(grad_with_loss_func)
+    # normalize argnum once at construction instead of on every call
+    if argnum is None:
+        select = lambda args: args
+    else:
+        idxs = argnum if isinstance(argnum, list) else [argnum]
+        select = lambda args: [args[i] for i in idxs]
+    @functools.wraps(func)
     def wrapped(*args):
-        return grad_with_loss_func(*args)[0]
+        """Wrapped function."""
+        variables = select(args)
+        assert all(isinstance(x, NDArray) for x in variables), \
+            "type of autograd input should NDArray."
+        grads = [zeros(x.shape, ctx=x.context, dtype=x.dtype)
+                 for x in variables]
+        mark_variables(variables, grads)
+        with train_section():
+            outputs = func(*args)
+        compute_gradient([outputs] if isinstance(outputs, NDArray) else outputs)
+        return grads
     return wrapped